@@ -1,16 +1,18 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 # Use SQLite for tests (GitHub Actions), Postgres otherwise
 USE_SQLITE_FOR_TESTS = os.getenv("USE_SQLITE_FOR_TESTS", "false").lower() == "true"
 
 if USE_SQLITE_FOR_TESTS:
-    DATABASE_URL = "sqlite:///:memory:"
-    engine = create_engine(
+    DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+    engine = create_async_engine(
         DATABASE_URL,
         connect_args={"check_same_thread": False},  # ✅ SQLite multithread fix
+        poolclass=StaticPool,  # share the single in-memory DB across threads
         pool_pre_ping=True,
     )
 else:
@@ -19,22 +21,63 @@ else:
     POSTGRES_DB = os.getenv("POSTGRES_DB", "customers")
     POSTGRES_HOST = os.getenv("POSTGRES_HOST", "localhost")
     POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
     DATABASE_URL = (
-        f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+        f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+    )
+    # Pool is per worker process: size it so WEB_CONCURRENCY x (pool + overflow)
+    # stays within the Postgres connection budget (see Dockerfile).
+    engine = create_async_engine(
+        DATABASE_URL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=30,
+        pool_pre_ping=True,
+        pool_recycle=1800,  # recycle before server/proxy idle timeouts
+        pool_use_lifo=True,  # keep a small set of hot connections in use
+        query_cache_size=1200,  # compiled-statement cache (default 500)
     )
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",  # no-op for :memory:, applies to file-backed DBs
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA busy_timeout=5000",
+)
+
+if DATABASE_URL.startswith("sqlite"):
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
-def get_db():
+async def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
+
+_initialized = False
+INIT_DB_LOCK_ID = 722001  # arbitrary key for pg_advisory_xact_lock
 
-def init_db():
-    """Create tables (used at startup or in tests)."""
+async def init_db():
+    """Create tables once per process (used at startup or in tests)."""
+    global _initialized
+    if _initialized:
+        return
     from . import models
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            # Gunicorn workers start together; serialise their DDL so only the first
+            # creates objects and the rest find them via checkfirst.
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": INIT_DB_LOCK_ID})
+        await conn.run_sync(Base.metadata.create_all, checkfirst=True)
+    _initialized = True
@@ -1,50 +1,142 @@
+import asyncio
 import logging
 import os
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from typing import List, Optional
 
+import redis.asyncio as redis
+from argon2 import PasswordHasher
 from fastapi import Depends, FastAPI, HTTPException, Query, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from redis.exceptions import RedisError
+from sqlalchemy import delete, select, update
 from sqlalchemy.exc import IntegrityError, OperationalError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .db import get_db, init_db
-from .models import Customer
+from .db import SessionLocal, get_db, init_db
+from .models import Customer, customer_search_text
 from .schemas import CustomerCreate, CustomerResponse, CustomerUpdate
 
 # Logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
-    handlers=[logging.StreamHandler(sys.stdout)],
-)
+class CachedTimeFormatter(logging.Formatter):
+    """Formatter that only calls strftime once per second of log timestamps."""
+
+    _cache = (None, "")
+
+    def formatTime(self, record, datefmt=None):
+        if datefmt:
+            return super().formatTime(record, datefmt)
+        second = int(record.created)
+        cached_second, cached_text = self._cache
+        if second != cached_second:
+            cached_text = time.strftime(self.default_time_format, self.converter(record.created))
+            self._cache = (second, cached_text)
+        return self.default_msec_format % (cached_text, record.msecs)
+
+
+log_handler = logging.StreamHandler(sys.stdout)
+log_handler.setFormatter(CachedTimeFormatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s"))
 logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(log_handler)
+logger.propagate = False
 logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
 logging.getLogger("uvicorn.error").setLevel(logging.INFO)
 
-# FastAPI App
-app = FastAPI(title="Customer Service API", version="1.0.0")
-app.add_middleware(
-    CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"]
+# Redis cache (opt-in: disabled unless REDIS_HOST is set)
+REDIS_HOST = os.getenv("REDIS_HOST")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "60"))
+LIST_VERSION_KEY = "customers:list:version"
+
+redis_client: Optional[redis.Redis] = None
+customer_list_adapter = TypeAdapter(List[CustomerResponse])
+
+# Passwords
+password_hasher = PasswordHasher()  # argon2id, 64 MiB per hash
+# Each hash allocates memory_cost, so cap concurrent hashes per worker to bound
+# memory under a burst of signups (PASSWORD_HASH_WORKERS x 64 MiB).
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+password_hash_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
 )
 
-# Startup
-@app.on_event("startup")
-async def startup_event():
+
+async def cache_get(key: str) -> Optional[bytes]:
+    if redis_client is None:
+        return None
+    try:
+        return await redis_client.get(key)
+    except RedisError as e:
+        logger.warning(f"Cache read failed for {key}: {e}")
+        return None
+
+
+async def cache_set(key: str, value: bytes):
+    if redis_client is None:
+        return
+    try:
+        await redis_client.set(key, value, ex=CACHE_TTL_SECONDS)
+    except RedisError as e:
+        logger.warning(f"Cache write failed for {key}: {e}")
+
+
+async def invalidate_customer_cache(customer_id: Optional[int] = None):
+    """Retire a cached customer and every cached list page."""
+    if redis_client is None:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        # Cached keys embed these versions, so bumping them orphans the old entries
+        # until their TTL. A reader that loaded the row before the write therefore
+        # stores it under a stale version instead of overwriting the fresh one.
+        if customer_id is not None:
+            pipe.incr(f"customer:{customer_id}:version")
+        pipe.incr(LIST_VERSION_KEY)
+        await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Cache invalidation failed: {e}")
+
+
+# Startup / Shutdown
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global redis_client
+    if not REDIS_HOST:
+        logger.info("Redis cache disabled (REDIS_HOST not set).")
+    else:
+        # Short timeouts so an unavailable cache degrades to a DB read
+        redis_client = redis.Redis(
+            host=REDIS_HOST, port=REDIS_PORT, socket_timeout=0.5, socket_connect_timeout=0.5
+        )
+
     retries, delay = 10, 5
     for i in range(retries):
         try:
-            init_db()
+            await init_db()
             logger.info("Customer Service: Tables ensured.")
             break
-        except OperationalError as e:
+        except (OperationalError, OSError) as e:
             logger.warning(f"DB connection failed (attempt {i+1}/{retries}): {e}")
             if i < retries - 1:
-                time.sleep(delay)
+                await asyncio.sleep(delay)
             else:
                 logger.critical("DB unavailable after retries. Exiting.")
                 sys.exit(1)
+    yield
+    if redis_client is not None:
+        await redis_client.aclose()
+
+# FastAPI App
+app = FastAPI(title="Customer Service API", version="1.0.0", lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"]
+)
 
 # Health + Root
 @app.get("/")
@@ -57,10 +149,14 @@ async def health_check():
 
 # CRUD Endpoints
 @app.post("/customers/", response_model=CustomerResponse, status_code=status.HTTP_201_CREATED)
-async def create_customer(customer: CustomerCreate, db: Session = Depends(get_db)):
+async def create_customer(customer: CustomerCreate, db: AsyncSession = Depends(get_db)):
+    # argon2 releases the GIL, so hashing in a worker thread keeps the event loop free
+    password_hash = await asyncio.get_running_loop().run_in_executor(
+        password_hash_executor, password_hasher.hash, customer.password
+    )
     db_customer = Customer(
         email=customer.email,
-        password_hash=customer.password,
+        password_hash=password_hash,
         first_name=customer.first_name,
         last_name=customer.last_name,
         phone_number=customer.phone_number,
@@ -68,66 +164,115 @@ async def create_customer(customer: CustomerCreate, db: Session = Depends(get_db
     )
     try:
         db.add(db_customer)
-        db.commit()
-        db.refresh(db_customer)
+        await db.commit()
+        await db.refresh(db_customer)
+        await invalidate_customer_cache()
         return db_customer
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Email already registered.")
     except Exception as e:
-        db.rollback()
-        logger.error(f"Create customer failed: {e}", exc_info=True)
+        await db.rollback()
+        logger.error("Create customer failed: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail="Could not create customer.")
 
 @app.get("/customers/", response_model=List[CustomerResponse])
-def list_customers(skip: int = 0, limit: int = 100, search: Optional[str] = None, db: Session = Depends(get_db)):
-    query = db.query(Customer)
+async def list_customers(
+    skip: int = 0,
+    limit: int = 100,
+    search: Optional[str] = None,
+    after_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    version = await cache_get(LIST_VERSION_KEY) or b"0"
+    cache_key = f"customers:list:{version.decode()}:{skip}:{limit}:{after_id}:{search or ''}"
+    cached = await cache_get(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
+    stmt = select(Customer)
     if search:
         pattern = f"%{search}%"
-        query = query.filter(
-            Customer.first_name.ilike(pattern) |
-            Customer.last_name.ilike(pattern) |
-            Customer.email.ilike(pattern)
-        )
-    return query.offset(skip).limit(limit).all()
+        stmt = stmt.where(customer_search_text.ilike(pattern))
+    # Keyset pagination: pass the last customer_id seen instead of skip to avoid
+    # the database scanning and discarding `skip` rows on deep pages.
+    if after_id is not None:
+        stmt = stmt.where(Customer.customer_id > after_id)
+    result = await db.execute(stmt.order_by(Customer.customer_id).offset(skip).limit(limit))
+    customers = customer_list_adapter.validate_python(result.scalars().all(), from_attributes=True)
+    body = customer_list_adapter.dump_json(customers)
+    await cache_set(cache_key, body)
+    return Response(content=body, media_type="application/json")
+
+@app.get("/customers/export")
+async def export_customers():
+    """Stream every customer as NDJSON without materialising the full result set."""
+    async def generate():
+        async with SessionLocal() as db:
+            stmt = select(Customer).order_by(Customer.customer_id).execution_options(yield_per=500)
+            async for customer in await db.stream_scalars(stmt):
+                yield CustomerResponse.model_validate(customer).model_dump_json() + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 @app.get("/customers/{customer_id}", response_model=CustomerResponse)
-def get_customer(customer_id: int, db: Session = Depends(get_db)):
-    customer = db.query(Customer).filter(Customer.customer_id == customer_id).first()
+async def get_customer(customer_id: int, db: AsyncSession = Depends(get_db)):
+    version = await cache_get(f"customer:{customer_id}:version") or b"0"
+    cache_key = f"customer:{customer_id}:{version.decode()}"
+    cached = await cache_get(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
+    customer = await db.get(Customer, customer_id)
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
-    return customer
+    body = CustomerResponse.model_validate(customer).model_dump_json().encode()
+    await cache_set(cache_key, body)
+    return Response(content=body, media_type="application/json")
 
 @app.put("/customers/{customer_id}", response_model=CustomerResponse)
-async def update_customer(customer_id: int, customer_data: CustomerUpdate, db: Session = Depends(get_db)):
-    db_customer = db.query(Customer).filter(Customer.customer_id == customer_id).first()
-    if not db_customer:
-        raise HTTPException(status_code=404, detail="Customer not found")
-
+async def update_customer(customer_id: int, customer_data: CustomerUpdate, db: AsyncSession = Depends(get_db)):
     update_data = customer_data.model_dump(exclude_unset=True)
     if "password" in update_data:
         update_data.pop("password")  # forbid updating password here
 
-    for key, value in update_data.items():
-        setattr(db_customer, key, value)
+    if not update_data:
+        db_customer = await db.get(Customer, customer_id)
+        if not db_customer:
+            raise HTTPException(status_code=404, detail="Customer not found")
+        return db_customer
 
+    # Single UPDATE ... RETURNING round trip instead of SELECT + UPDATE + refresh
+    stmt = (
+        update(Customer)
+        .where(Customer.customer_id == customer_id)
+        .values(**update_data)
+        .returning(Customer)
+    )
     try:
-        db.commit()
-        db.refresh(db_customer)
+        db_customer = (await db.execute(stmt)).scalar_one_or_none()
+        if not db_customer:
+            await db.rollback()
+            raise HTTPException(status_code=404, detail="Customer not found")
+        await db.commit()
+        await invalidate_customer_cache(customer_id)
         return db_customer
+    except HTTPException:
+        raise
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Email already in use.")
     except Exception as e:
-        db.rollback()
-        logger.error(f"Update failed: {e}", exc_info=True)
+        await db.rollback()
+        logger.error("Update failed: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail="Could not update customer.")
 
 @app.delete("/customers/{customer_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_customer(customer_id: int, db: Session = Depends(get_db)):
-    customer = db.query(Customer).filter(Customer.customer_id == customer_id).first()
-    if not customer:
+async def delete_customer(customer_id: int, db: AsyncSession = Depends(get_db)):
+    stmt = delete(Customer).where(Customer.customer_id == customer_id).returning(Customer.customer_id)
+    if (await db.execute(stmt)).scalar_one_or_none() is None:
+        await db.rollback()
         raise HTTPException(status_code=404, detail="Customer not found")
-    db.delete(customer)
-    db.commit()
+    await db.commit()
+    await invalidate_customer_cache(customer_id)
     return Response(status_code=204)
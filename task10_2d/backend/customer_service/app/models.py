@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy import DDL, Column, DateTime, Integer, String, event, literal_column
 from sqlalchemy.sql import func  # For auto-populating timestamps
 
 from .db import Base
@@ -22,3 +22,25 @@ class Customer(Base):
         String representation of the Customer object, useful for debugging.
         """
         return f"<Customer(id={self.customer_id}, email='{self.email}', name='{self.first_name} {self.last_name}')>"
+
+
+# Expression searched by GET /customers/?search=... . Kept identical to the index
+# expression below so Postgres can answer the ILIKE from the trigram index.
+customer_search_text = (
+    Customer.first_name + literal_column("' '") + Customer.last_name + literal_column("' '") + Customer.email
+)
+
+# Postgres only: GIN trigram index so '%term%' searches avoid a full table scan.
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(
+        "CREATE INDEX IF NOT EXISTS customers_week05_search_trgm ON customers_week05 "
+        "USING gin ((first_name || ' ' || last_name || ' ' || email) gin_trgm_ops)"
+    ).execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,10 @@
+import asyncio
+
+import pytest
+from app.db import init_db
+
+
+@pytest.fixture(scope="session")
+def db_tables():
+    # Create tables once for the whole test session; request it from DB tests only
+    asyncio.run(init_db())
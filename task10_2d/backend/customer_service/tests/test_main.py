@@ -1,6 +1,12 @@
+import asyncio
+import json
 import os
+import fakeredis
 from fastapi.testclient import TestClient
-from app.main import app  # adjust if your entry file is named differently
+import app.main as main
+from app.db import SessionLocal
+from app.main import app, password_hasher  # adjust if your entry file is named differently
+from app.models import Customer
 
 client = TestClient(app)
 
@@ -15,3 +21,105 @@ def test_health_check():
     assert response.status_code == 200
     assert data["status"] == "ok"
     assert data["service"] == expected_service
+
+
+def create_customer(email, **fields):
+    payload = {"email": email, "password": "s3cretpass", "first_name": "Test", "last_name": "User"}
+    payload.update(fields)
+    response = client.post("/customers/", json=payload)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_create_customer_hashes_password(db_tables):
+    customer_id = create_customer("hash@example.com")["customer_id"]
+
+    async def load_hash():
+        async with SessionLocal() as db:
+            return (await db.get(Customer, customer_id)).password_hash
+
+    password_hash = asyncio.run(load_hash())
+    assert password_hash != "s3cretpass"
+    assert password_hasher.verify(password_hash, "s3cretpass")
+
+
+def test_list_customers_after_id_pages_by_key(db_tables):
+    ids = [create_customer(f"page{i}@example.com")["customer_id"] for i in range(4)]
+
+    response = client.get("/customers/", params={"after_id": ids[0], "limit": 2})
+
+    assert response.status_code == 200
+    assert [c["customer_id"] for c in response.json()] == ids[1:3]
+
+
+def test_export_customers_streams_ndjson(db_tables):
+    created = create_customer("export@example.com", phone_number="555-0100")
+
+    response = client.get("/customers/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["customer_id"] for r in rows] == sorted(r["customer_id"] for r in rows)
+    exported = next(r for r in rows if r["customer_id"] == created["customer_id"])
+    assert exported == created
+
+
+def test_update_customer_not_found(db_tables):
+    response = client.put("/customers/999999", json={"first_name": "Ghost"})
+    assert response.status_code == 404
+
+
+def test_update_customer_empty_body_returns_customer(db_tables):
+    created = create_customer("noop@example.com")
+
+    response = client.put(f"/customers/{created['customer_id']}", json={})
+
+    assert response.status_code == 200
+    assert response.json() == created
+
+
+def test_update_customer_changes_fields(db_tables):
+    created = create_customer("rename@example.com")
+
+    response = client.put(f"/customers/{created['customer_id']}", json={"first_name": "Renamed"})
+
+    assert response.status_code == 200
+    assert response.json()["first_name"] == "Renamed"
+    assert response.json()["email"] == "rename@example.com"
+
+
+def test_update_customer_duplicate_email(db_tables):
+    create_customer("taken@example.com")
+    other = create_customer("other@example.com")
+
+    response = client.put(f"/customers/{other['customer_id']}", json={"email": "taken@example.com"})
+
+    assert response.status_code == 400
+    assert client.get(f"/customers/{other['customer_id']}").json()["email"] == "other@example.com"
+
+
+def test_delete_customer(db_tables):
+    created = create_customer("delete@example.com")
+
+    assert client.delete(f"/customers/{created['customer_id']}").status_code == 204
+    assert client.get(f"/customers/{created['customer_id']}").status_code == 404
+    assert client.delete(f"/customers/{created['customer_id']}").status_code == 404
+
+
+def test_cached_customer_is_invalidated_on_update(db_tables, monkeypatch):
+    monkeypatch.setattr(main, "redis_client", fakeredis.FakeAsyncRedis())
+    # One event loop for the whole test, since the Redis client is bound to it
+    with TestClient(app) as cached_client:
+        created = cached_client.post(
+            "/customers/",
+            json={"email": "cached@example.com", "password": "s3cretpass", "first_name": "Test", "last_name": "User"},
+        ).json()
+        customer_id = created["customer_id"]
+
+        assert cached_client.get(f"/customers/{customer_id}").json()["first_name"] == "Test"
+        assert cached_client.get("/customers/", params={"search": "cached@"}).json()[0]["first_name"] == "Test"
+        cached_client.put(f"/customers/{customer_id}", json={"first_name": "Fresh"})
+
+        assert cached_client.get(f"/customers/{customer_id}").json()["first_name"] == "Fresh"
+        assert cached_client.get("/customers/", params={"search": "cached@"}).json()[0]["first_name"] == "Fresh"
@@ -4,6 +4,7 @@ import logging
 import os
 import sys
 import time
+from contextlib import asynccontextmanager
 from typing import Optional
 
 import aio_pika
@@ -17,24 +18,37 @@ from .models import Order
 from .schemas import OrderCreate, OrderResponse
 
 # Logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
-    handlers=[logging.StreamHandler(sys.stdout)],
-)
+class CachedTimeFormatter(logging.Formatter):
+    """Formatter that only calls strftime once per second of log timestamps."""
+
+    _cache = (None, "")
+
+    def formatTime(self, record, datefmt=None):
+        if datefmt:
+            return super().formatTime(record, datefmt)
+        second = int(record.created)
+        cached_second, cached_text = self._cache
+        if second != cached_second:
+            cached_text = time.strftime(self.default_time_format, self.converter(record.created))
+            self._cache = (second, cached_text)
+        return self.default_msec_format % (cached_text, record.msecs)
+
+
+log_handler = logging.StreamHandler(sys.stdout)
+log_handler.setFormatter(CachedTimeFormatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s"))
 logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(log_handler)
+logger.propagate = False
 logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
 
-# FastAPI
-app = FastAPI(title="Order Service API", version="1.0.0")
-app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
-
 # RabbitMQ (disabled in CI)
 USE_SQLITE_FOR_TESTS = os.getenv("USE_SQLITE_FOR_TESTS", "false").lower() == "true"
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "localhost")
 RABBITMQ_PORT = int(os.getenv("RABBITMQ_PORT", "5672"))
 RABBITMQ_USER = os.getenv("RABBITMQ_USER", "guest")
 RABBITMQ_PASS = os.getenv("RABBITMQ_PASS", "guest")
+RABBITMQ_PREFETCH_COUNT = int(os.getenv("RABBITMQ_PREFETCH_COUNT", "64"))
 
 rabbitmq_connection: Optional[aio_pika.Connection] = None
 rabbitmq_channel: Optional[aio_pika.Channel] = None
@@ -51,6 +65,8 @@ async def connect_to_rabbitmq():
             global rabbitmq_connection, rabbitmq_channel, rabbitmq_exchange
             rabbitmq_connection = await aio_pika.connect_robust(url)
             rabbitmq_channel = await rabbitmq_connection.channel()
+            # Bound unacked deliveries per consumer instead of the unlimited default
+            await rabbitmq_channel.set_qos(prefetch_count=RABBITMQ_PREFETCH_COUNT)
             rabbitmq_exchange = await rabbitmq_channel.declare_exchange(
                 "ecomm_events", aio_pika.ExchangeType.DIRECT, durable=True
             )
@@ -67,23 +83,28 @@ async def close_rabbitmq_connection():
         await rabbitmq_connection.close()
 
 
-@app.on_event("startup")
-async def startup_event():
+async def ensure_tables():
     try:
-        init_db()
+        await init_db()
         logger.info("Order Service: Tables ensured.")
-    except OperationalError as e:
+    except (OperationalError, OSError) as e:
         logger.critical(f"DB unavailable: {e}")
         sys.exit(1)
 
-    await connect_to_rabbitmq()
-
 
-@app.on_event("shutdown")
-async def shutdown_event():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Database and RabbitMQ setup are independent, so run them concurrently
+    await asyncio.gather(ensure_tables(), connect_to_rabbitmq())
+    yield
     await close_rabbitmq_connection()
 
 
+# FastAPI
+app = FastAPI(title="Order Service API", version="1.0.0", lifespan=lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Order Service!"}